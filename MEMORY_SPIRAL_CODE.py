@@ -1,6 +1,19 @@
 import math
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it the kernels below run as plain Python.
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 #i dont like your spiral
 
 # For file selection dialog
@@ -31,6 +44,8 @@ FONT_PATH = None           # or a .ttf path, e.g. "Helvetica.ttf"
 TEXT_COLOR = (0, 0, 0, 255)
 ANOMALY_COLOR = (255, 0, 0, 255)   # red for anomaly chars
 BG_COLOR = (255, 255, 255)
+ANGLE_BUCKET_DEG = 2.0     # glyph rotations are snapped to multiples of this
+GLYPH_ALPHA_CUTOFF = 16    # glyph pixels at or below this alpha are not drawn
 
 # Temporal anomaly (slowdown) parameters
 SLOW_CHARS_NOMINAL = 150    # ~100 chars/s for 1.5s
@@ -59,72 +74,78 @@ def load_font(size):
     return ImageFont.load_default()
 
 
-def generate_spiral_positions(num_chars,
-                              char_spacing=CHAR_SPACING,
-                              initial_radius=INITIAL_RADIUS,
-                              coil_spacing=COIL_SPACING):
-    """
-    Generate positions along an Archimedean spiral for num_chars characters.
-    """
-    a = initial_radius
+def text_bbox(font, text):
+    """Bounding box of text, measured without drawing when the font allows."""
+    getbbox = getattr(font, "getbbox", None)
+    if getbbox is not None:
+        return getbbox(text)
+    dummy = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
+    return ImageDraw.Draw(dummy).textbbox((0, 0), text, font=font)
+
+
+@njit(cache=True)
+def _arc_length(theta, b):
+    """Arc length of the spiral r = b*theta measured from theta = 0."""
+    return 0.5 * b * (theta * math.sqrt(1.0 + theta * theta) + math.asinh(theta))
+
+
+@njit(cache=True)
+def _spiral_positions_nb(num_chars, char_spacing, initial_radius, coil_spacing):
     b = coil_spacing / (2.0 * math.pi)
 
-    points = []
-    theta = 0.0
-    r = a + b * theta
-    x = r * math.cos(theta)
-    y = r * math.sin(theta)
+    # r = a + b*theta is the spiral r = b*phi shifted by phi0 = a/b,
+    # so solve for phi and shift back.
+    phi0 = initial_radius / b
+    s0 = _arc_length(phi0, b)
 
-    last_x, last_y = x, y
-    accumulated_length = 0.0
-    target_length = 0.0
-    step_theta = 0.02
+    px = np.empty(num_chars, dtype=np.float64)
+    py = np.empty(num_chars, dtype=np.float64)
+    ptheta = np.empty(num_chars, dtype=np.float64)
 
-    while len(points) < num_chars:
-        theta += step_theta
-        r = a + b * theta
-        x = r * math.cos(theta)
-        y = r * math.sin(theta)
+    for i in range(num_chars):
+        target = i * char_spacing + s0
 
-        dx = x - last_x
-        dy = y - last_y
-        ds = math.hypot(dx, dy)
+        # sqrt(2s/b) bounds the solution from above; s(phi) is convex,
+        # so Newton converges monotonically from there.
+        phi = math.sqrt(2.0 * target / b)
+        for _ in range(5):
+            phi -= (_arc_length(phi, b) - target) / (b * math.sqrt(1.0 + phi * phi))
 
-        accumulated_length += ds
+        theta = phi - phi0
+        r = b * phi
+        px[i] = r * math.cos(theta)
+        py[i] = r * math.sin(theta)
+        ptheta[i] = theta
 
-        while accumulated_length >= target_length and len(points) < num_chars:
-            excess = accumulated_length - target_length
-            t = 1.0 - excess / ds if ds != 0 else 0.0
-            px = last_x + t * dx
-            py = last_y + t * dy
-            points.append((px, py, theta))
-            target_length += char_spacing
+    return px, py, ptheta
 
-        last_x, last_y = x, y
 
-    return points
+def generate_spiral_positions(num_chars,
+                              char_spacing=CHAR_SPACING,
+                              initial_radius=INITIAL_RADIUS,
+                              coil_spacing=COIL_SPACING):
+    """
+    Generate positions along an Archimedean spiral for num_chars characters.
+
+    Inverts the closed-form arc length with a few Newton steps per character
+    instead of walking the curve. Returns separate px, py, theta arrays.
+    """
+    return _spiral_positions_nb(int(num_chars), float(char_spacing),
+                                float(initial_radius), float(coil_spacing))
 
 
-def compute_tangent_angles(points):
+def compute_tangent_angles(px, py):
     """Compute rotation angle of each character along the spiral."""
-    n = len(points)
-    angles_deg = []
-    for i in range(n):
-        if i == 0:
-            x1, y1, _ = points[i]
-            x2, y2, _ = points[i + 1]
-        elif i == n - 1:
-            x1, y1, _ = points[i - 1]
-            x2, y2, _ = points[i]
-        else:
-            x1, y1, _ = points[i - 1]
-            x2, y2, _ = points[i + 1]
-
-        dx = x2 - x1
-        dy = y2 - y1
-        angle_rad = math.atan2(dy, dx)
-        angles_deg.append(math.degrees(angle_rad))
-    return angles_deg
+    n = len(px)
+    dx = np.zeros(n)
+    dy = np.zeros(n)
+    if n > 1:
+        # Central differences inside, one-sided at the ends
+        dx[0], dy[0] = px[1] - px[0], py[1] - py[0]
+        dx[-1], dy[-1] = px[-1] - px[-2], py[-1] - py[-2]
+        dx[1:-1] = px[2:] - px[:-2]
+        dy[1:-1] = py[2:] - py[:-2]
+    return np.degrees(np.arctan2(dy, dx))
 
 
 # ---------------------------
@@ -134,13 +155,18 @@ def compute_tangent_angles(points):
 def chars_revealed_at_time(t, num_chars, anomaly_frac,
                            slow_chars_nominal=SLOW_CHARS_NOMINAL,
                            slow_duration=SLOW_DURATION):
-    """Piecewise-linear reveal based on anomaly-centered slowdown."""
+    """
+    Piecewise-linear reveal based on anomaly-centered slowdown.
+
+    t may be a scalar or an array of times; the result has the same shape.
+    """
+    t = np.asarray(t, dtype=np.float64)
     D = DURATION_S
     N = num_chars
     if N <= 0:
-        return 0.0
+        return np.zeros_like(t)
     if N == 1:
-        return 1.0 if t >= 0 else 0.0
+        return np.where(t >= 0, 1.0, 0.0)
 
     a = max(0.0, min(1.0, anomaly_frac))
 
@@ -159,24 +185,19 @@ def chars_revealed_at_time(t, num_chars, anomaly_frac,
     t2 = min(D,   t_center + half_T)
 
     if t2 <= t1:
-        return N * min(1.0, max(0.0, t / D))
+        return N * np.clip(t / D, 0.0, 1.0)
 
     slow_slope = W_eff / (t2 - t1)
     pre_slope  = i1 / t1 if t1 > 0 else 0.0
     post_slope = (N - i2) / (D - t2) if D > t2 else 0.0
 
-    if t <= 0:
-        C = 0.0
-    elif t < t1:
-        C = pre_slope * t
-    elif t <= t2:
-        C = i1 + slow_slope * (t - t1)
-    elif t < D:
-        C = i2 + post_slope * (t - t2)
-    else:
-        C = float(N)
+    C = np.select(
+        [t <= 0, t < t1, t <= t2, t < D],
+        [0.0, pre_slope * t, i1 + slow_slope * (t - t1), i2 + post_slope * (t - t2)],
+        default=float(N),
+    )
 
-    return max(0.0, min(float(N), C))
+    return np.clip(C, 0.0, float(N))
 
 
 # ---------------------------
@@ -189,136 +210,232 @@ def compute_bulge_deltas(num_chars, anomaly_frac):
     - stays 0 before anomaly
     - increases smoothly after anomaly
     - never decreases (so no overlap)
-    """
-    if num_chars <= 0:
-        return []
-    if num_chars == 1:
-        return [0.0]
 
+    1 - exp(-d^2/2) only grows with d, and d only grows past the anomaly,
+    so the sequence is monotonic without a separate pass.
+    """
     a = max(0.0, min(1.0, anomaly_frac))
-    deltas_raw = [0.0] * num_chars
-
-    for i in range(num_chars):
-        t_char = i / (num_chars - 1)
-        if t_char <= a:
-            delta = 0.0
-        else:
-            d = (t_char - a) / max(1e-9, BULGE_SIGMA)
-            delta = BULGE_AMP * (1.0 - math.exp(-0.5 * d * d))
-        deltas_raw[i] = delta
-
-    # enforce monotonic increasing
-    deltas = []
-    max_so_far = 0.0
-    for d in deltas_raw:
-        if d > max_so_far:
-            max_so_far = d
-        deltas.append(max_so_far)
-    return deltas
+    t_char = np.arange(num_chars) / max(num_chars - 1, 1)
+    d = (t_char - a) / max(1e-9, BULGE_SIGMA)
+    return np.where(t_char > a, BULGE_AMP * (1.0 - np.exp(-0.5 * d * d)), 0.0)
 
 
 # ---------------------------
 # Main animation logic
 # ---------------------------
 
-def create_spiral_gif(text, anomaly_pct, output_path="spiral_growing.gif"):
-    """Render the animated spiral."""
-    text = text.replace("\r", " ").replace("\n", " ")
-    text = " ".join(text.split())
-    chars = list(text)
-    num_chars = len(chars)
+def rasterize_glyphs(chars, font):
+    """Draw each distinct character upright once per color, keyed by (char, color)."""
+    glyph_cache = {}
+    pad = 4
+    for ch in set(chars):
+        if ch == " ":
+            continue
 
-    if num_chars == 0:
-        print("No text entered.")
-        return
+        bbox = text_bbox(font, ch)
+        w = bbox[2] - bbox[0]
+        h = bbox[3] - bbox[1]
 
-    anomaly_frac = max(0.0, min(1.0, anomaly_pct / 100.0))
-    print(f"Anomaly at: {anomaly_pct}%")
+        for color in (TEXT_COLOR, ANOMALY_COLOR):
+            glyph = Image.new("RGBA", (w + 2*pad, h + 2*pad), (0, 0, 0, 0))
+            gdraw = ImageDraw.Draw(glyph)
+            gdraw.text((pad, pad), ch, font=font, fill=color)
+            glyph_cache[(ch, color)] = glyph
+    return glyph_cache
 
-    positions = generate_spiral_positions(num_chars)
-    tangent_angles = compute_tangent_angles(positions)
-    base_radii = [math.hypot(x, y) for (x, y, _) in positions]
 
-    bulge_deltas = compute_bulge_deltas(num_chars, anomaly_frac)
+def build_palette():
+    """
+    Fixed 8-color palette shared by every frame: background, text and
+    anomaly colors, plus blends toward the background for antialiased
+    edges. Index 0 is the background.
+    """
+    bg = np.array(BG_COLOR[:3], dtype=np.float64)
+    text = np.array(TEXT_COLOR[:3], dtype=np.float64)
+    anomaly = np.array(ANOMALY_COLOR[:3], dtype=np.float64)
+
+    colors = [bg, text, anomaly]
+    colors += [text + (bg - text) * f for f in (0.25, 0.5, 0.75)]
+    colors += [anomaly + (bg - anomaly) * f for f in (1 / 3, 2 / 3)]
+
+    palette = Image.new("P", (1, 1))
+    palette.putpalette(np.rint(colors).astype(np.uint8).ravel().tolist())
+    return palette
+
+
+def _rotate_glyph(glyph, angle_deg, palette):
+    """Rotate an upright glyph into a (index array, mask array, width, height) tile."""
+    # Bilinear is indistinguishable from bicubic at this glyph size.
+    rotated = glyph.rotate(angle_deg, expand=True, resample=Image.BILINEAR)
+    rw, rh = rotated.size
+    # Pre-blend over the background so the antialiased edge
+    # survives a plain masked copy, then map onto the fixed palette.
+    backdrop = Image.new("RGBA", rotated.size, BG_COLOR + (255,))
+    blended = Image.alpha_composite(backdrop, rotated).convert("RGB")
+    glyph_idx = np.asarray(blended.quantize(palette=palette, dither=Image.Dither.NONE))
+    glyph_mask = np.asarray(rotated.getchannel("A")) > GLYPH_ALPHA_CUTOFF
+    return glyph_idx, glyph_mask, rw, rh
+
+
+def build_rotated_glyphs(chars, tangent_angles, is_anomaly, glyph_cache, palette):
+    """
+    Look up the rotated glyph for every character.
+
+    Glyph, color and tangent angle don't change between frames, so each
+    frame only has to blit. Angles are snapped to ANGLE_BUCKET_DEG so
+    characters sharing a (char, color, bucket) share one rotation.
+    Returns a list of (palette index array, mask array, width, height),
+    with None for spaces.
+    """
+    keys = [None] * len(chars)
+    for i, ch in enumerate(chars):
+        if ch == " ":
+            continue
+
+        color = ANOMALY_COLOR if is_anomaly[i] else TEXT_COLOR
+        angle_bucket = int(round(tangent_angles[i] / ANGLE_BUCKET_DEG))
+        keys[i] = (ch, color, angle_bucket)
+
+    # Pillow releases the GIL while rotating, so threads are enough here.
+    unique_keys = list({key for key in keys if key is not None})
+    with ThreadPoolExecutor() as ex:
+        tiles = ex.map(_rotate_glyph,
+                       [glyph_cache[(ch, color)] for ch, color, _ in unique_keys],
+                       [bucket * ANGLE_BUCKET_DEG for _, _, bucket in unique_keys],
+                       [palette] * len(unique_keys))
+        rotated_cache = dict(zip(unique_keys, tiles))
+
+    return [rotated_cache[key] if key is not None else None for key in keys]
+
+
+def _render_frame(state, frame_idx):
+    """Render one animation frame; returns (palettized frame, chars shown)."""
+    max_char_index = int(state["max_char_indices"][frame_idx])
+    x_adj = state["x_adj"]
+    y_adj = state["y_adj"]
+    r_adj_all = state["r_adj_all"]
+    rotated_glyphs = state["rotated_glyphs"]
 
-    font = load_font(FONT_SIZE)
     canvas_center = CANVAS_SIZE // 2
     max_r_canvas = canvas_center - MARGIN
 
-    frames = []
+    # Determine zoom
+    current_max_r = r_adj_all[:max_char_index].max()
+    scale = max_r_canvas / current_max_r if current_max_r else 1.0
 
-    for frame_idx in range(NUM_FRAMES):
-        t = frame_idx / FPS
-        C = chars_revealed_at_time(t, num_chars, anomaly_frac)
-        max_char_index = max(1, min(num_chars, int(C)))
+    # Map to canvas
+    sx = (canvas_center + np.rint(x_adj[:max_char_index] * scale)).astype(np.int32)
+    sy = (canvas_center - np.rint(y_adj[:max_char_index] * scale)).astype(np.int32)
 
-        # Determine zoom
-        visible_adj_r = []
-        for i in range(max_char_index):
-            r0 = base_radii[i] or 1e-6
-            r_adj = r0 * (1 + bulge_deltas[i])
-            visible_adj_r.append(r_adj)
+    # Palette indices; 0 is the background
+    frame_arr = np.zeros((CANVAS_SIZE, CANVAS_SIZE), dtype=np.uint8)
 
-        current_max_r = max(visible_adj_r) if visible_adj_r else 1.0
-        scale = max_r_canvas / current_max_r if current_max_r else 1.0
+    for i in range(max_char_index):
+        glyph = rotated_glyphs[i]
+        if glyph is None:
+            continue
 
-        frame = Image.new("RGB", (CANVAS_SIZE, CANVAS_SIZE), BG_COLOR)
+        glyph_idx, glyph_mask, rw, rh = glyph
+        x0 = int(sx[i] - rw/2)
+        y0 = int(sy[i] - rh/2)
 
-        for i in range(max_char_index):
-            ch = chars[i]
-            if ch == " ":
-                continue
+        # Clip the tile to the canvas
+        gx0, gy0 = max(0, -x0), max(0, -y0)
+        gx1, gy1 = min(rw, CANVAS_SIZE - x0), min(rh, CANVAS_SIZE - y0)
+        if gx0 >= gx1 or gy0 >= gy1:
+            continue
 
-            x0, y0, _ = positions[i]
-            r0 = base_radii[i] or 1e-6
+        tile = frame_arr[y0 + gy0:y0 + gy1, x0 + gx0:x0 + gx1]
+        np.copyto(tile, glyph_idx[gy0:gy1, gx0:gx1],
+                  where=glyph_mask[gy0:gy1, gx0:gx1])
 
-            t_char = i / (num_chars - 1) if num_chars > 1 else 0.0
+    frame = Image.fromarray(frame_arr)
+    frame.putpalette(state["palette"])
+    return frame, max_char_index
 
-            # Apply bulge
-            delta = bulge_deltas[i]
-            x = x0 * (1 + delta)
-            y = y0 * (1 + delta)
 
-            # Map to canvas
-            sx = canvas_center + int(x * scale)
-            sy = canvas_center - int(y * scale)
+def _stream_frames(ex, state, num_chars, max_pending):
+    """
+    Yield rendered frames in order as they finish.
 
-            # Choose color
-            if abs(t_char - anomaly_frac) <= ANOMALY_COLOR_WIDTH:
-                color = ANOMALY_COLOR
-            else:
-                color = TEXT_COLOR
+    At most max_pending frames are queued ahead of the GIF writer, so
+    finished frames don't pile up in memory while earlier ones render.
+    """
+    pending = deque()
+    next_idx = 0
+    for frame_idx in range(NUM_FRAMES):
+        while next_idx < NUM_FRAMES and len(pending) < max_pending:
+            pending.append(ex.submit(_render_frame, state, next_idx))
+            next_idx += 1
 
-            angle_deg = tangent_angles[i]
+        frame, max_char_index = pending.popleft().result()
+        print(f"Frame {frame_idx+1}/{NUM_FRAMES} — chars shown: {max_char_index}/{num_chars}")
+        yield frame
 
-            # Render character patch
-            dummy = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
-            ddraw = ImageDraw.Draw(dummy)
-            bbox = ddraw.textbbox((0, 0), ch, font=font)
-            w = bbox[2] - bbox[0]
-            h = bbox[3] - bbox[1]
 
-            pad = 4
-            glyph = Image.new("RGBA", (w + 2*pad, h + 2*pad), (0, 0, 0, 0))
-            gdraw = ImageDraw.Draw(glyph)
-            gdraw.text((pad, pad), ch, font=font, fill=color)
+def create_spiral_gif(text, anomaly_pct, output_path="spiral_growing.gif"):
+    """Render the animated spiral."""
+    text = text.replace("\r", " ").replace("\n", " ")
+    text = " ".join(text.split())
+    chars = list(text)
+    num_chars = len(chars)
 
-            rotated = glyph.rotate(angle_deg, expand=True, resample=Image.BICUBIC)
-            rw, rh = rotated.size
+    if num_chars == 0:
+        print("No text entered.")
+        return
 
-            frame.paste(rotated, (int(sx - rw/2), int(sy - rh/2)), rotated)
+    anomaly_frac = max(0.0, min(1.0, anomaly_pct / 100.0))
+    print(f"Anomaly at: {anomaly_pct}%")
 
-        frames.append(frame.convert("P", palette=Image.ADAPTIVE))
+    px, py, _ = generate_spiral_positions(num_chars)
+    tangent_angles = compute_tangent_angles(px, py)
+    # Spiral radii are small, so the overflow-safe hypot buys nothing.
+    base_radii = np.sqrt(px * px + py * py)
 
-        print(f"Frame {frame_idx+1}/{NUM_FRAMES} — chars shown: {max_char_index}/{num_chars}")
+    bulge_deltas = compute_bulge_deltas(num_chars, anomaly_frac)
 
-    frames[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames[1:],
-        duration=FRAME_DURATION_MS,
-        loop=0
-    )
+    # Frame-invariant per-character values
+    t_chars = np.arange(num_chars) / max(num_chars - 1, 1)
+    is_anomaly = np.abs(t_chars - anomaly_frac) <= ANOMALY_COLOR_WIDTH
+    safe_base_r = np.where(base_radii > 0, base_radii, 1e-6)
+    r_adj_all = safe_base_r * (1 + bulge_deltas)
+    x_adj = px * (1 + bulge_deltas)
+    y_adj = py * (1 + bulge_deltas)
+
+    # Reveal schedule for the whole frame grid
+    frame_times = np.arange(NUM_FRAMES) / FPS
+    revealed = chars_revealed_at_time(frame_times, num_chars, anomaly_frac)
+    max_char_indices = np.clip(revealed.astype(np.int64), 1, num_chars)
+
+    font = load_font(FONT_SIZE)
+    palette = build_palette()
+    glyph_cache = rasterize_glyphs(chars, font)
+    rotated_glyphs = build_rotated_glyphs(chars, tangent_angles, is_anomaly,
+                                          glyph_cache, palette)
+
+    state = {
+        "max_char_indices": max_char_indices,
+        "x_adj": x_adj,
+        "y_adj": y_adj,
+        "r_adj_all": r_adj_all,
+        "rotated_glyphs": rotated_glyphs,
+        "palette": palette.getpalette(),
+    }
+
+    # Frames are independent, so render them in parallel and hand them to
+    # the GIF writer in order as they finish instead of collecting a list.
+    # The heavy lifting (NumPy copies) releases the GIL, so
+    # threads share the state above without pickling it to workers.
+    workers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        frames = _stream_frames(ex, state, num_chars, 2 * workers)
+        next(frames).save(
+            output_path,
+            save_all=True,
+            append_images=frames,
+            duration=FRAME_DURATION_MS,
+            loop=0
+        )
 
     print(f"\n✨ Saved spiral animation as {os.path.abspath(output_path)} ✨")
 